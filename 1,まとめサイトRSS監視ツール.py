@@ -10,68 +10,52 @@
 - 芸能人名と炎上内容を抽出してJSONに保存
 """
 
+import asyncio
+import hashlib
 import json
-import os
 import re
-import time
+import sqlite3
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from datetime import datetime
 import feedparser
-import google.generativeai as genai
+from common import (
+    append_journal, get_config, get_data, get_model, get_rate_limiter, has_pending_journal,
+    save_data,
+)
 
 
-def load_config():
-    """設定ファイルを読み込む"""
-    with open('config.json', 'r', encoding='utf-8') as f:
-        return json.load(f)
+# RSSフィードの同時取得数
+RSS_FETCH_WORKERS = 4
 
+# Gemini APIの同時リクエスト数
+GEMINI_CONCURRENCY = 8
 
-def load_data():
-    """既存のデータファイルを読み込む"""
-    config = load_config()
-    data_file = config['paths']['data_file']
-    
-    if os.path.exists(data_file):
-        with open(data_file, 'r', encoding='utf-8') as f:
-            return json.load(f)
-    return []
+# Gemini APIの1リクエストでまとめて判定する記事数
+GEMINI_BATCH_SIZE = 5
 
+# Gemini判定（プロンプト・キャッシュキー）に使う記事概要の文字数
+SUMMARY_MAX_CHARS = 200
 
-def save_data(data):
-    """データファイルに保存"""
-    config = load_config()
-    data_file = config['paths']['data_file']
-    
-    with open(data_file, 'w', encoding='utf-8') as f:
-        json.dump(data, f, ensure_ascii=False, indent=2)
-    print(f"✓ データを保存しました: {data_file}")
+# トピックに保存する記事概要の文字数（記事本文が取れない場合はツール3が生成に使う）
+STORED_SUMMARY_CHARS = 500
 
+# 判定結果キャッシュのパス（config.json の paths.gemini_cache で上書き可能）
+DEFAULT_GEMINI_CACHE_FILE = 'gemini_cache.sqlite'
 
-def init_gemini_api(config):
-    """Gemini APIを初期化"""
-    genai.configure(api_key=config['gemini_api']['api_key'])
-    model = genai.GenerativeModel('gemini-2.0-flash-exp')
-    return model
+# ゴシップ記事の目印になるキーワード（どれも含まない記事は Gemini API で判定しない）
+GOSSIP_TRIGGER_TERMS = [
+    '炎上', '不倫', '浮気', '逮捕', '書類送検', 'スキャンダル', '熱愛', '交際', '破局',
+    '結婚', '離婚', '妊娠', '謝罪', '活動休止', '引退', '解散', '脱退', '降板', '契約解除',
+    '流出', '文春', '暴露', '騒動', '疑惑', 'トラブル', '批判', '物議', '激怒', '告発',
+    '芸能', '俳優', '女優', '歌手', 'アイドル', 'タレント', '芸人', 'アナウンサー',
+    'YouTuber', 'ユーチューバー', 'インフルエンサー', '配信者',
+]
+_GOSSIP_TRIGGER_RE = re.compile('|'.join(map(re.escape, GOSSIP_TRIGGER_TERMS)), re.IGNORECASE)
 
 
-def extract_image_url(description):
-    """
-    RSS descriptionからimg srcを抽出
-    
-    Args:
-        description: RSS記事の概要（HTMLタグ含む）
-    
-    Returns:
-        str or None: 画像URL
-    """
-    if not description:
-        return None
-    
-    # imgタグのsrc属性を抽出
-    img_match = re.search(r'<img[^>]+src=[\'"]([^\'"]+)[\'"]', description, re.IGNORECASE)
-    if img_match:
-        return img_match.group(1)
-    
-    return None
+def may_be_gossip(article_title, article_summary):
+    """タイトル・概要にゴシップ記事のキーワードを含むか（Gemini APIで判定する前の絞り込み）"""
+    return _GOSSIP_TRIGGER_RE.search(f"{article_title}\n{article_summary[:500]}") is not None
 
 
 def get_rss_entries(feed_url):
@@ -98,46 +82,56 @@ def get_rss_entries(feed_url):
         return []
 
 
-def check_celebrity_gossip(model, article_title, article_summary):
+async def check_celebrity_gossip(model, limiter, articles):
     """
-    Gemini APIで芸能人ゴシップかどうか判定
+    Gemini APIで複数記事が芸能人ゴシップかどうかをまとめて判定
     
     Args:
         model: Gemini model
-        article_title: 記事タイトル
-        article_summary: 記事概要
+        limiter: Gemini APIのレート制限
+        articles: (記事タイトル, 記事概要) のリスト
     
     Returns:
-        dict or None: {
-            'is_celebrity_gossip': bool,
-            'celebrities': list,
-            'topic': str
-        }
+        list: 記事ごとの判定結果（articles と同じ順序、失敗時は None）
+            dict: {
+                'is_celebrity_gossip': bool,
+                'celebrities': list,
+                'topic': str
+            }
     """
-    prompt = f"""
-以下のまとめサイト記事を分析してください。
-
+    article_texts = '\n'.join(
+        f"""[{i}]
 タイトル: {article_title}
-概要: {article_summary[:200]}
+概要: {article_summary[:SUMMARY_MAX_CHARS]}
+"""
+        for i, (article_title, article_summary) in enumerate(articles, 1)
+    )
+    
+    prompt = f"""
+以下のまとめサイト記事{len(articles)}件をそれぞれ分析してください。
 
-この記事が「芸能人・インフルエンサー・有名人の炎上・ゴシップ」に該当するか判定してください。
+{article_texts}
+各記事が「芸能人・インフルエンサー・有名人の炎上・ゴシップ」に該当するか判定してください。
 
 判定基準:
 ✅ 該当する: 芸能人の不倫、スキャンダル、炎上、逮捕、トラブル
 ❌ 該当しない: 政治、スポーツ試合結果（炎上でない）、アニメ・ゲーム（芸能人無関係）、一般ニュース
 
-以下の情報をJSON形式で返してください:
-{{
-  "is_celebrity_gossip": true/false,
-  "celebrities": ["芸能人名1", "芸能人名2"],
-  "topic": "炎上内容の要約（20文字以内）"
-}}
+記事ごとに以下の情報を持つJSONオブジェクトを、記事と同じ順番で{len(articles)}件並べたJSON配列で返してください:
+[
+  {{
+    "is_celebrity_gossip": true/false,
+    "celebrities": ["芸能人名1", "芸能人名2"],
+    "topic": "炎上内容の要約（20文字以内）"
+  }}
+]
 
-回答は上記JSON形式のみで返してください（説明文は不要）。
+回答は上記JSON配列のみで返してください（説明文は不要）。
 """
     
     try:
-        response = model.generate_content(prompt)
+        await limiter.acquire_async(limiter.estimate_tokens(prompt))
+        response = await asyncio.to_thread(model.generate_content, prompt)
         result_text = response.text.strip()
         
         # JSON部分を抽出（マークダウンのコードブロックを除去）
@@ -147,53 +141,124 @@ def check_celebrity_gossip(model, article_title, article_summary):
                 result_text = result_text[4:]
             result_text = result_text.strip()
         
-        result = json.loads(result_text)
-        return result
+        results = json.loads(result_text)
+        if not isinstance(results, list) or len(results) != len(articles):
+            raise ValueError(f"判定結果の件数が一致しません（{len(articles)}件中 {len(results)}件）")
+        # 形式の正しくない要素（dict以外）は判定失敗として扱う
+        return [result if isinstance(result, dict) else None for result in results]
     
     except Exception as e:
         print(f"    ✗ Gemini API エラー: {e}")
-        return None
+        delay_time = limiter.backoff(e)
+        if delay_time is not None:
+            print(f"    ⏱ API制限のため以降の判定を {delay_time:.1f}秒待機します")
+        return [None] * len(articles)
 
 
-def is_already_processed(data, article_url):
-    """既に処理済みの記事かチェック"""
-    return any(item['source_article_url'] == article_url for item in data)
+async def classify_articles(model, limiter, articles):
+    """
+    複数記事のゴシップ判定を並行実行
+    
+    GEMINI_BATCH_SIZE 件ずつ1リクエストにまとめ、バッチ単位で並行実行する
+    
+    Args:
+        model: Gemini model
+        limiter: Gemini APIのレート制限
+        articles: 判定対象の記事リスト（article_title, article_summary を含むdict）
+    
+    Yields:
+        tuple: (記事, 判定結果)（判定が終わったバッチから順に）
+    """
+    semaphore = asyncio.Semaphore(GEMINI_CONCURRENCY)
+    
+    async def bounded(batch):
+        async with semaphore:
+            results = await check_celebrity_gossip(
+                model, limiter,
+                [(article['article_title'], article['article_summary']) for article in batch])
+            return zip(batch, results)
+    
+    batches = [articles[i:i + GEMINI_BATCH_SIZE] for i in range(0, len(articles), GEMINI_BATCH_SIZE)]
+    for batch_results in asyncio.as_completed([bounded(batch) for batch in batches]):
+        for article, result in await batch_results:
+            yield article, result
 
 
-def generate_topic_id():
-    """トピックIDを生成"""
-    return datetime.now().strftime('%Y%m%d_%H%M%S')
+def open_gossip_cache(cache_file):
+    """判定結果キャッシュ（SQLite）を開く"""
+    cache = sqlite3.connect(cache_file)
+    cache.execute(
+        'CREATE TABLE IF NOT EXISTS gossip_cache (key TEXT PRIMARY KEY, result TEXT NOT NULL)')
+    return cache
 
 
-def main():
-    print("=" * 60)
-    print("まとめサイトRSS監視ツール 起動")
-    print("=" * 60)
+def gossip_cache_key(article_title, article_summary):
+    """
+    判定結果キャッシュのキーを生成
     
-    # 設定とデータ読み込み
-    config = load_config()
-    data = load_data()
+    複数のまとめサイトに同じ記事が転載されていても1回の判定で済むよう、
+    判定に使うタイトルと概要（先頭200文字）から生成する
+    """
+    return hashlib.sha1(f"{article_title}\n{article_summary[:SUMMARY_MAX_CHARS]}".encode('utf-8')).hexdigest()
+
+
+def get_cached_result(cache, key):
+    """キャッシュ済みの判定結果を取得（なければ None）"""
+    row = cache.execute('SELECT result FROM gossip_cache WHERE key = ?', (key,)).fetchone()
+    return json.loads(row[0]) if row else None
+
+
+def store_cached_results(cache, items):
+    """判定結果をキャッシュに保存（items: (キー, 判定結果) のリスト）"""
+    with cache:
+        cache.executemany(
+            'INSERT OR REPLACE INTO gossip_cache (key, result) VALUES (?, ?)',
+            [(key, json.dumps(result, ensure_ascii=False)) for key, result in items])
+
+
+def generate_topic_id(used_ids):
+    """
+    トピックIDを生成
     
-    # API初期化
-    print("\n[1] Gemini APIを初期化中...")
-    gemini_model = init_gemini_api(config)
-    print("✓ API初期化完了")
+    判定を並行実行すると同じ秒に複数トピックが追加されるため、
+    重複する場合は連番を付与する
+    """
+    base_id = datetime.now().strftime('%Y%m%d_%H%M%S')
+    topic_id = base_id
+    suffix = 1
+    while topic_id in used_ids:
+        topic_id = f"{base_id}_{suffix}"
+        suffix += 1
+    used_ids.add(topic_id)
+    return topic_id
+
+
+def collect_candidates(rss_sources, seen_urls):
+    """
+    RSSを巡回して判定対象の記事を集める
     
-    # RSS監視
-    print("\n[2] まとめサイトRSSを巡回中...")
-    rss_sources = config['rss_feeds']['sources']
+    Args:
+        rss_sources: RSSフィードの設定リスト
+        seen_urls: 処理済みの記事URL（判定対象にした記事も追加される）
     
-    new_topics_count = 0
+    Returns:
+        list: 判定対象の記事リスト
+    """
+    candidates = []
+    
+    # RSSエントリ取得（取得・解析のみスレッドプールで並行実行）
+    with ThreadPoolExecutor(max_workers=RSS_FETCH_WORKERS) as executor:
+        futures = {
+            executor.submit(get_rss_entries, source['url']): source
+            for source in rss_sources
+        }
+        fetched = [(futures[future], future.result()) for future in as_completed(futures)]
     
-    for source in rss_sources:
+    for source, entries in fetched:
         source_name = source['name']
-        source_url = source['url']
         
         print(f"\n  → {source_name} をチェック中...")
         
-        # RSSエントリ取得
-        entries = get_rss_entries(source_url)
-        
         if not entries:
             print(f"    記事が見つかりません")
             continue
@@ -214,65 +279,143 @@ def main():
             elif hasattr(entry, 'description'):
                 article_summary = entry.description
             
-            # 既に処理済みかチェック
-            if is_already_processed(data, article_url):
+            # 既に処理済み・判定待ちかチェック
+            if article_url in seen_urls:
                 continue
+            seen_urls.add(article_url)
             
             print(f"\n    記事をチェック: {article_title[:50]}...")
             print(f"      本文: {len(article_summary)} 文字")
             
-            # 画像URL抽出
-            image_url = extract_image_url(article_summary)
-            if image_url:
-                print(f"    ✓ 画像URL検出: {image_url[:60]}...")
-            
-            # Gemini APIで芸能人ゴシップ判定
-            result = check_celebrity_gossip(gemini_model, article_title, article_summary)
-            
-            # ★★★ レート制限対策: 6秒待機 ★★★
-            time.sleep(6)
-            
-            if not result:
+            # キーワードに該当しない記事は判定しない
+            if not may_be_gossip(article_title, article_summary):
+                print(f"      ゴシップのキーワードなし - スキップ")
                 continue
             
-            if result.get('is_celebrity_gossip') and result.get('celebrities'):
-                print(f"    ✓ 芸能人ゴシップ検出: {', '.join(result['celebrities'])}")
-                print(f"      トピック: {result['topic']}")
-                
-                # 新規トピックとして追加
-                topic = {
-                    'id': generate_topic_id(),
-                    'timestamp': datetime.now().isoformat(),
-                    'source_type': 'rss',
-                    'source_name': source_name,
-                    'source_article_url': article_url,
-                    'article_title': article_title,
-                    'article_summary': article_summary[:500],
-                    'article_image_url': image_url or '',
-                    'celebrities': result['celebrities'],
-                    'topic': result['topic'],
-                    'status': 'detected',
-                    'downloaded_image': '',
-                    'upscaled_image': '',
-                    'generated_title': '',
-                    'generated_post_text': '',
-                    'onelink_url': '',
-                    'posted_tweet_id': '',
-                    'manual_approved': False
-                }
-                
-                data.append(topic)
-                new_topics_count += 1
-                
-                print(f"    ✓ トピックID追加: {topic['id']}")
-    
-    # データ保存
-    if new_topics_count > 0:
-        print(f"\n[3] 新規トピック {new_topics_count}件を保存中...")
+            candidates.append({
+                'source_name': source_name,
+                'article_url': article_url,
+                'article_title': article_title,
+                'article_summary': article_summary
+            })
+    
+    return candidates
+
+
+def create_topic(article, result, used_ids):
+    """
+    判定結果から新規トピックを作成
+    
+    後続のツールが設定する項目（downloaded_image, generated_title など）は
+    設定時に追加する（空の項目は保存しない）
+    """
+    return {
+        'id': generate_topic_id(used_ids),
+        'timestamp': datetime.now().isoformat(),
+        'source_type': 'rss',
+        'source_name': article['source_name'],
+        'source_article_url': article['article_url'],
+        'article_title': article['article_title'],
+        'article_summary': article['article_summary'][:STORED_SUMMARY_CHARS],
+        'celebrities': result['celebrities'],
+        'topic': result['topic'],
+        'status': 'detected'
+    }
+
+
+async def detect_new_topics(config, data, model, limiter, on_topic=None):
+    """
+    RSSを巡回して芸能人ゴシップを検出し、新規トピックとして data に追加
+    
+    Args:
+        config: 設定
+        data: トピックのリスト
+        model: Gemini model
+        limiter: Gemini APIのレート制限
+        on_topic: トピック追加時に呼ぶコルーチン関数（パイプライン実行時に次の工程へ渡す）
+    
+    Returns:
+        int: 新規トピック数
+    """
+    # RSS監視
+    print("\n[2] まとめサイトRSSを巡回中...")
+    # 処理済み・判定待ちの記事URL（重複チェック用）
+    seen_urls = {item['source_article_url'] for item in data}
+    candidates = await asyncio.to_thread(
+        collect_candidates, config['rss_feeds']['sources'], seen_urls)
+    
+    new_topics_count = 0
+    used_ids = {item['id'] for item in data}
+    
+    async def add_topic(article, result):
+        nonlocal new_topics_count
+        if not result or not (result.get('is_celebrity_gossip') and result.get('celebrities')):
+            return
+        
+        print(f"\n    ✓ 芸能人ゴシップ検出: {', '.join(result['celebrities'])}")
+        print(f"      記事: {article['article_title'][:50]}...")
+        print(f"      トピック: {result['topic']}")
+        
+        # 新規トピックとして追加
+        topic = create_topic(article, result, used_ids)
+        data.append(topic)
+        append_journal(topic)
+        new_topics_count += 1
+        
+        print(f"    ✓ トピックID追加: {topic['id']}")
+        if on_topic:
+            await on_topic(topic)
+    
+    # 判定済みの記事はキャッシュから取得
+    cache = open_gossip_cache(config['paths'].get('gemini_cache', DEFAULT_GEMINI_CACHE_FILE))
+    try:
+        uncached = []
+        for article in candidates:
+            article['cache_key'] = gossip_cache_key(article['article_title'], article['article_summary'])
+            result = get_cached_result(cache, article['cache_key'])
+            if not isinstance(result, dict):
+                uncached.append(article)
+            else:
+                await add_topic(article, result)
+        
+        # Gemini APIで芸能人ゴシップ判定（レート制限内で並行実行、終わったバッチから追加）
+        print(f"\n[3] Gemini APIで{len(uncached)}件の記事を判定中..."
+              f"（キャッシュ済み {len(candidates) - len(uncached)}件）")
+        async for article, result in classify_articles(model, limiter, uncached):
+            if isinstance(result, dict):
+                store_cached_results(cache, [(article['cache_key'], result)])
+            await add_topic(article, result)
+    finally:
+        cache.close()
+    
+    return new_topics_count
+
+
+def main():
+    print("=" * 60)
+    print("まとめサイトRSS監視ツール 起動")
+    print("=" * 60)
+    
+    # 設定とデータ読み込み
+    config = get_config()
+    data = get_data()
+    
+    # API初期化
+    print("\n[1] Gemini APIを初期化中...")
+    gemini_model = get_model()
+    print("✓ API初期化完了")
+    
+    # RSS監視・ゴシップ判定
+    new_topics_count = asyncio.run(
+        detect_new_topics(config, data, gemini_model, get_rate_limiter()))
+    
+    # データ保存（前回中断時のジャーナルが残っている場合も保存して反映）
+    if new_topics_count > 0 or has_pending_journal():
+        print(f"\n[4] 新規トピック {new_topics_count}件を保存中...")
         save_data(data)
         print(f"✓ 完了！")
     else:
-        print(f"\n[3] 新規トピックはありませんでした")
+        print(f"\n[4] 新規トピックはありませんでした")
     
     print("\n" + "=" * 60)
     print(f"監視完了: 新規トピック {new_topics_count}件")
@@ -10,41 +10,68 @@
 - Gemini APIで画像を判定
 """
 
-import json
+import asyncio
 import os
 import re
-import time
-import base64
 import requests
+import soupsieve
+from concurrent.futures import ThreadPoolExecutor
 from bs4 import BeautifulSoup
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 from urllib.parse import urljoin
-import google.generativeai as genai
+from common import get_config, get_data, get_model, get_rate_limiter, save_data
 
 
-def load_config():
-    """設定ファイルを読み込む"""
-    with open('config.json', 'r', encoding='utf-8') as f:
-        return json.load(f)
+# 同時に処理するトピック数
+TOPIC_CONCURRENCY = 8
 
+# 記事ページの取得・解析を行うスレッド数（HTML解析はイベントループの外で行う）
+ARTICLE_WORKERS = 4
+_ARTICLE_EXECUTOR = ThreadPoolExecutor(max_workers=ARTICLE_WORKERS)
 
-def load_data():
-    """データファイルを読み込む"""
-    config = load_config()
-    data_file = config['paths']['data_file']
-    
-    if os.path.exists(data_file):
-        with open(data_file, 'r', encoding='utf-8') as f:
-            return json.load(f)
-    return []
+# 画像1枚あたりの入力トークン数（Gemini APIの換算値）
+GEMINI_IMAGE_TOKENS = 258
 
+# ダウンロードする画像サイズの下限・上限（バイト）
+MIN_IMAGE_BYTES = 10 * 1024
+MAX_IMAGE_BYTES = 10 * 1024 * 1024
 
-def save_data(data):
-    """データファイルに保存"""
-    config = load_config()
-    data_file = config['paths']['data_file']
-    
-    with open(data_file, 'w', encoding='utf-8') as f:
-        json.dump(data, f, ensure_ascii=False, indent=2)
+# ファイル名に使えない文字
+_SAFE_NAME_RE = re.compile(r'[^\w\s-]')
+
+# 記事本文のセレクター（優先順）
+ARTICLE_CONTENT_SELECTORS = [
+    '.entry-content',
+    '.article-content',
+    '.post-content',
+    '.content',
+    'article',
+    '.article',
+    '.main-content',
+    '.post-body'
+]
+
+# 記事内画像のセレクター（優先順）
+ARTICLE_IMAGE_SELECTORS = [
+    '.article img',
+    'article img',
+    '.entry-content img',
+    '.post-content img',
+    '.content img',
+    '.article-content img'
+]
+
+REQUEST_HEADERS = {
+    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'
+}
+
+# 記事ページ・画像の取得で接続を使い回す（同じサイトへのTLSハンドシェイクは1回で済む）
+SESSION = requests.Session()
+_adapter = HTTPAdapter(pool_connections=16, pool_maxsize=32,
+                       max_retries=Retry(total=2, backoff_factor=0.5))
+SESSION.mount('https://', _adapter)
+SESSION.mount('http://', _adapter)
 
 
 def get_og_image(soup, url):
@@ -59,24 +86,43 @@ def get_og_image(soup, url):
     return None
 
 
+def compile_selectors(selectors):
+    """
+    セレクターを事前コンパイル
+    
+    Returns:
+        tuple: (全セレクターを結合したもの, 各セレクターのリスト)
+    """
+    return soupsieve.compile(', '.join(selectors)), [soupsieve.compile(sel) for sel in selectors]
+
+
+_CONTENT_SELECTORS = compile_selectors(ARTICLE_CONTENT_SELECTORS)
+_IMAGE_SELECTORS = compile_selectors(ARTICLE_IMAGE_SELECTORS)
+
+
+def select_by_priority(soup, compiled_selectors):
+    """
+    1回の走査で各セレクターに一致する要素を集める
+    
+    Returns:
+        list: セレクターごとの一致要素リスト（セレクターの優先順、各リスト内は文書順）
+    """
+    combined, selectors = compiled_selectors
+    matches = [[] for _ in selectors]
+    for element in combined.select(soup):
+        for i, selector in enumerate(selectors):
+            if selector.match(element):
+                matches[i].append(element)
+    return matches
+
+
 def get_article_content(soup):
     """記事本文を取得"""
     try:
-        # 記事本文のセレクター（複数パターンを試行）
-        selectors = [
-            '.entry-content',
-            '.article-content', 
-            '.post-content',
-            '.content',
-            'article',
-            '.article',
-            '.main-content',
-            '.post-body'
-        ]
-        
-        for selector in selectors:
-            content = soup.select_one(selector)
-            if content:
+        # 記事本文のセレクター（優先順に各セレクターの最初の要素を試行）
+        for elements in select_by_priority(soup, _CONTENT_SELECTORS):
+            if elements:
+                content = elements[0]
                 # テキストを取得
                 text = content.get_text(strip=True, separator='\n')
                 if len(text) > 100:  # 最小文字数チェック
@@ -99,17 +145,7 @@ def get_article_content(soup):
 def get_article_images(soup, url):
     """記事内の画像URLを取得"""
     try:
-        selectors = [
-            '.article img',
-            'article img',
-            '.entry-content img',
-            '.post-content img',
-            '.content img',
-            '.article-content img'
-        ]
-        
-        for selector in selectors:
-            imgs = soup.select(selector)
+        for imgs in select_by_priority(soup, _IMAGE_SELECTORS):
             if imgs:
                 image_urls = []
                 for img in imgs:
@@ -132,48 +168,52 @@ def get_article_images(soup, url):
         return []
 
 
-def download_image(image_url, save_path):
-    """画像をダウンロード"""
+def download_image(image_url, log_tag=""):
+    """
+    画像をダウンロード（画像以外・サイズ範囲外は本文を読み切らずに除外）
+    
+    Args:
+        image_url: 画像URL
+        log_tag: ログの先頭に付ける識別子（例: "[topic_id] og_image"）
+    
+    Returns:
+        bytes or None: 画像データ（保存は判定で承認されてから行う）
+    """
     try:
-        headers = {
-            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'
-        }
-        
-        response = requests.get(image_url, headers=headers, timeout=10)
-        response.raise_for_status()
-        
-        # 画像サイズチェック（最小10KB）
-        if len(response.content) < 10240:
-            return False
+        with SESSION.get(image_url, headers=REQUEST_HEADERS, timeout=10, stream=True) as response:
+            response.raise_for_status()
+            
+            # 本文を読む前にヘッダーで除外（HEADを別に送らずレスポンスヘッダーで判断）
+            content_type = response.headers.get('Content-Type', '')
+            if content_type and not content_type.startswith('image/'):
+                return None
+            
+            # Content-Length があれば本文を読む前にサイズチェック
+            content_length = int(response.headers.get('Content-Length') or 0)
+            if content_length and not MIN_IMAGE_BYTES <= content_length <= MAX_IMAGE_BYTES:
+                return None
             
-        # ディレクトリ作成
-        os.makedirs(os.path.dirname(save_path), exist_ok=True)
+            image_data = response.raw.read(MAX_IMAGE_BYTES + 1, decode_content=True)
         
-        with open(save_path, 'wb') as f:
-            f.write(response.content)
+        # 画像サイズチェック（最小10KB・最大10MB）
+        if not MIN_IMAGE_BYTES <= len(image_data) <= MAX_IMAGE_BYTES:
+            return None
             
-        return True
+        return image_data
     except Exception as e:
-        print(f"    ✗ ダウンロードエラー: {e}")
-        return False
-
+        print(f"    ✗ {log_tag} ダウンロードエラー: {e}")
+        return None
 
-def init_gemini_api(config):
-    """Gemini APIを初期化"""
-    genai.configure(api_key=config['gemini_api']['api_key'])
-    model = genai.GenerativeModel('gemini-2.0-flash-exp')
-    return model
 
-
-def judge_image_with_gemini(model, image_path, max_retries=3):
-    """Gemini APIで画像を判定"""
+async def judge_image_with_gemini(model, image_data, limiter, log_tag="", max_retries=3):
+    """
+    Gemini APIで画像を判定（limiter でリクエスト数・トークン数を制限）
+    
+    log_tag はログの先頭に付ける識別子（例: "[topic_id] og_image"）
+    """
     for attempt in range(max_retries):
         try:
-            # 画像をbase64エンコード
-            with open(image_path, 'rb') as f:
-                image_data = base64.b64encode(f.read()).decode()
-            
-            # Gemini APIに送信
+            # Gemini APIに送信（画像データはSDK側でエンコードされる）
             prompt = """この画像を見て、以下の基準で判定してください：
 
 ✅ OK: 人物の顔がはっきり写っている（芸能人・有名人・著名人）
@@ -186,7 +226,9 @@ def judge_image_with_gemini(model, image_path, max_retries=3):
                 "data": image_data
             }
             
-            response = model.generate_content([prompt, image_part], 
+            await limiter.acquire_async(GEMINI_IMAGE_TOKENS + limiter.estimate_tokens(prompt))
+            response = await asyncio.to_thread(
+                model.generate_content, [prompt, image_part],
                 request_options={"timeout": 30})
             
             result = response.text.strip().upper()
@@ -197,47 +239,60 @@ def judge_image_with_gemini(model, image_path, max_retries=3):
                 return False
                 
         except Exception as e:
-            print(f"    ⚠ Gemini判定エラー (試行{attempt + 1}/{max_retries}): {e}")
-            if attempt < max_retries - 1:
+            print(f"    ⚠ {log_tag} Gemini判定エラー (試行{attempt + 1}/{max_retries}): {e}")
+            
+            # API制限の場合は limiter 側で待機させる
+            delay_time = limiter.backoff(e)
+            if delay_time is not None:
+                print(f"    ⏱ {log_tag} API制限のため {delay_time:.1f}秒待機します")
+            elif attempt < max_retries - 1:
                 wait_time = (attempt + 1) * 5
-                print(f"    ⏱ {wait_time}秒待機中...")
-                time.sleep(wait_time)
+                print(f"    ⏱ {log_tag} {wait_time}秒待機中...")
+                await asyncio.sleep(wait_time)
     
     return False  # 全てのリトライが失敗した場合
 
 
-def process_topic(topic, config, gemini_model):
-    """トピックの画像を処理"""
-    topic_id = topic['id']
-    celebrities = topic['celebrities']
-    article_url = topic['source_article_url']
+async def download_and_judge(model, limiter, topic_id, img_type, image_url):
+    """
+    画像をダウンロードしてGemini APIで判定
     
-    print(f"\n  トピックID: {topic_id}")
-    print(f"  芸能人: {', '.join(celebrities)}")
-    print(f"  記事URL: {article_url}")
+    Returns:
+        bytes or None: 承認された場合は画像データ
+    """
+    # 複数トピックを並行処理するため、ログにはトピックIDを付ける
+    log_tag = f"[{topic_id}] {img_type}"
+    print(f"    🔍 {log_tag}: {image_url}")
     
-    # 記事ページを取得
-    try:
-        headers = {
-            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'
-        }
-        
-        response = requests.get(article_url, headers=headers, timeout=15)
-        response.raise_for_status()
-        soup = BeautifulSoup(response.content, 'html.parser')
-        
-        print(f"  ✓ 記事ページ取得完了")
-    except Exception as e:
-        print(f"  ✗ 記事取得エラー: {e}")
-        return False
+    # ダウンロード
+    image_data = await asyncio.to_thread(download_image, image_url, log_tag)
+    if not image_data:
+        print(f"    ✗ {log_tag} ダウンロード失敗: {image_url}")
+        return None
+    
+    # Gemini判定
+    print(f"    🤖 {log_tag} Gemini判定中")
+    if await judge_image_with_gemini(model, image_data, limiter, log_tag):
+        print(f"    ✅ {log_tag} 承認")
+        return image_data
+    
+    print(f"    ❌ {log_tag} 却下")
+    return None
+
+
+def fetch_article(article_url):
+    """
+    記事ページを取得・解析し、本文と画像候補を抽出
+    
+    Returns:
+        tuple: (記事本文, [(画像の種類, 画像URL), ...])
+    """
+    response = SESSION.get(article_url, headers=REQUEST_HEADERS, timeout=15)
+    response.raise_for_status()
+    soup = BeautifulSoup(response.content, 'lxml')
     
     # 記事本文を取得
     article_content = get_article_content(soup)
-    if article_content:
-        topic['article_content'] = article_content
-        print(f"  ✓ 記事本文取得: {len(article_content)}文字")
-    else:
-        print(f"  ⚠ 記事本文が見つかりませんでした")
     
     # og:imageを取得
     og_image_url = get_og_image(soup, article_url)
@@ -252,78 +307,108 @@ def process_topic(topic, config, gemini_model):
     for i, img_url in enumerate(article_images, 1):
         all_images.append((f'article_{i}', img_url))
     
+    return article_content, all_images
+
+
+async def process_topic(topic, config, gemini_model, judge_limiter):
+    """トピックの画像を処理"""
+    topic_id = topic['id']
+    celebrities = topic['celebrities']
+    article_url = topic['source_article_url']
+    
+    print(f"\n  トピックID: {topic_id}")
+    print(f"  芸能人: {', '.join(celebrities)}")
+    print(f"  記事URL: {article_url}")
+    
+    # 記事ページを取得・解析（専用のスレッドプールで実行）
+    try:
+        loop = asyncio.get_running_loop()
+        article_content, all_images = await loop.run_in_executor(
+            _ARTICLE_EXECUTOR, fetch_article, article_url)
+        
+        print(f"  ✓ [{topic_id}] 記事ページ取得完了")
+    except Exception as e:
+        print(f"  ✗ [{topic_id}] 記事取得エラー: {e}")
+        return False
+    
+    if article_content:
+        topic['article_content'] = article_content
+        print(f"  ✓ [{topic_id}] 記事本文取得: {len(article_content)}文字")
+    else:
+        print(f"  ⚠ [{topic_id}] 記事本文が見つかりませんでした")
+    
     if not all_images:
-        print(f"  ⚠ 画像が見つかりませんでした")
+        print(f"  ⚠ [{topic_id}] 画像が見つかりませんでした")
         return False
     
-    print(f"  📸 発見した画像: {len(all_images)}枚")
+    print(f"  📸 [{topic_id}] 発見した画像: {len(all_images)}枚")
     
-    # 画像をダウンロード・判定
-    approved_images = []
+    # 画像をダウンロード・判定（トピック内の画像は並行処理）
+    celebrity_names = '_'.join(celebrities)
+    safe_names = _SAFE_NAME_RE.sub('', celebrity_names)
     
-    for img_type, image_url in all_images:
-        print(f"    🔍 {img_type}: {image_url}")
-        
-        # ファイル名生成
-        celebrity_names = '_'.join(celebrities)
-        safe_names = re.sub(r'[^\w\s-]', '', celebrity_names)
-        img_number = len(approved_images) + 2  # 2から開始
-        
-        save_path = f"./images/{topic_id}_{safe_names}_{img_number}.jpg"
-        
-        # ダウンロード
-        if download_image(image_url, save_path):
-            print(f"    ✓ ダウンロード完了")
-            
-            # Gemini判定
-            print(f"    🤖 Gemini判定中...")
-            if judge_image_with_gemini(gemini_model, save_path):
-                print(f"    ✅ 承認")
-                approved_images.append(save_path)
-            else:
-                print(f"    ❌ 却下 - 削除")
-                os.remove(save_path)
-            
-            # レート制限対策
-            time.sleep(3)
-        else:
-            print(f"    ✗ ダウンロード失敗")
+    results = await asyncio.gather(*(
+        download_and_judge(gemini_model, judge_limiter, topic_id, img_type, image_url)
+        for img_type, image_url in all_images
+    ))
+    # ファイル名は承認順に番号を振る（2から開始）
+    approved_images = [
+        (f"./images/{topic_id}_{safe_names}_{img_number}.jpg", image_data)
+        for img_number, image_data in enumerate(filter(None, results), 2)
+    ]
     
     # 結果を保存
     if approved_images:
-        topic['downloaded_image'] = approved_images[0]
-        if len(approved_images) > 1:
-            topic['additional_images'] = approved_images[1:]
-        topic['status'] = 'image_downloaded'
-        
-        # 重複画像削除（承認が2枚以上の場合、1枚目を削除）
+        # 重複画像除外（承認が2枚以上の場合、1枚目は保存しない）
         if len(approved_images) >= 2:
-            first_image_path = approved_images[0]
-            if os.path.exists(first_image_path):
-                os.remove(first_image_path)
-                print(f"    🗑️ 重複画像を削除: {os.path.basename(first_image_path)}")
-                approved_images = approved_images[1:]
-                topic['downloaded_image'] = approved_images[0]
-                if len(approved_images) > 1:
-                    topic['additional_images'] = approved_images[1:]
-                else:
-                    topic.pop('additional_images', None)
+            print(f"    🗑️ 重複画像を除外: {os.path.basename(approved_images[0][0])}")
+            approved_images = approved_images[1:]
+        
+        # 承認された画像のみ保存
+        os.makedirs('./images', exist_ok=True)
+        for save_path, image_data in approved_images:
+            with open(save_path, 'wb') as f:
+                f.write(image_data)
+        
+        saved_paths = [save_path for save_path, _ in approved_images]
+        topic['downloaded_image'] = saved_paths[0]
+        if len(saved_paths) > 1:
+            topic['additional_images'] = saved_paths[1:]
+        else:
+            topic.pop('additional_images', None)
+        topic['status'] = 'image_downloaded'
         
-        print(f"  ✅ 完了: {len(approved_images)}枚の画像を保存")
+        print(f"  ✅ [{topic_id}] 完了: {len(approved_images)}枚の画像を保存")
         return True
     else:
-        print(f"  ❌ 承認された画像がありません")
+        print(f"  ❌ [{topic_id}] 承認された画像がありません")
         return False
 
 
+async def process_topics(topics, config, gemini_model, judge_limiter):
+    """
+    複数トピックを並行処理
+    
+    Returns:
+        list: 各トピックの処理結果（topics と同じ順序）
+    """
+    semaphore = asyncio.Semaphore(TOPIC_CONCURRENCY)
+    
+    async def bounded(topic):
+        async with semaphore:
+            return await process_topic(topic, config, gemini_model, judge_limiter)
+    
+    return await asyncio.gather(*(bounded(topic) for topic in topics))
+
+
 def main():
     print("=" * 60)
     print("画像ダウンロード＆記事本文取得ツール 起動")
     print("=" * 60)
     
     # 設定とデータ読み込み
-    config = load_config()
-    data = load_data()
+    config = get_config()
+    data = get_data()
     
     # 検出済みトピックを抽出
     detected_topics = [t for t in data if t['status'] == 'detected']
@@ -336,7 +421,7 @@ def main():
     
     # API初期化
     print("\n[1] API初期化中...")
-    gemini_model = init_gemini_api(config)
+    gemini_model = get_model()
     print("✓ 初期化完了")
     
     # 画像フォルダ作成
@@ -345,10 +430,10 @@ def main():
     # 各トピックを処理
     print("\n[2] 画像ダウンロード＆判定開始...")
     
-    success_count = 0
-    for topic in detected_topics:
-        if process_topic(topic, config, gemini_model):
-            success_count += 1
+    # 画像のダウンロードは並行して進め、Gemini判定のみレート制限をかける
+    results = asyncio.run(
+        process_topics(detected_topics, config, gemini_model, get_rate_limiter()))
+    success_count = sum(results)
     
     # データ保存
     print("\n[3] データ保存中...")
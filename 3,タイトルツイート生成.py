@@ -9,42 +9,10 @@
 
 import json
 import time
-import google.generativeai as genai
+from common import get_data, get_model, get_rate_limiter, save_data
 
 
-def load_config():
-    """設定ファイルを読み込む"""
-    with open('config.json', 'r', encoding='utf-8') as f:
-        return json.load(f)
-
-
-def load_data():
-    """データファイルを読み込む"""
-    config = load_config()
-    data_file = config['paths']['data_file']
-    
-    with open(data_file, 'r', encoding='utf-8') as f:
-        return json.load(f)
-
-
-def save_data(data):
-    """データファイルに保存"""
-    config = load_config()
-    data_file = config['paths']['data_file']
-    
-    with open(data_file, 'w', encoding='utf-8') as f:
-        json.dump(data, f, ensure_ascii=False, indent=2)
-    print(f"✓ データを保存しました")
-
-
-def init_gemini_api(config):
-    """Gemini APIを初期化"""
-    genai.configure(api_key=config['gemini_api']['api_key'])
-    model = genai.GenerativeModel('gemini-2.0-flash-exp')
-    return model
-
-
-def generate_content(model, celebrities, topic, article_summary, article_content="", max_retries=3):
+def generate_content(model, limiter, celebrities, topic, article_summary, article_content="", max_retries=3):
     """
     サイトタイトルとX投稿文を生成
     
@@ -95,6 +63,7 @@ def generate_content(model, celebrities, topic, article_summary, article_content
     
     for attempt in range(max_retries):
         try:
+            limiter.acquire(limiter.estimate_tokens(prompt))
             response = model.generate_content(prompt)
             result_text = response.text.strip()
             
@@ -109,25 +78,12 @@ def generate_content(model, celebrities, topic, article_summary, article_content
             return result
         
         except Exception as e:
-            error_str = str(e)
             print(f"    ⚠ コンテンツ生成エラー (試行{attempt + 1}/{max_retries}): {e}")
             
-            # Quota制限の場合
-            if "429" in error_str or "quota" in error_str.lower():
-                if "retry_delay" in error_str:
-                    # retry_delayを抽出
-                    import re
-                    delay_match = re.search(r'retry in (\d+(?:\.\d+)?)s', error_str)
-                    if delay_match:
-                        delay_time = float(delay_match.group(1))
-                        print(f"    ⏱ API制限のため {delay_time:.1f}秒待機中...")
-                        time.sleep(delay_time + 1)  # +1秒のバッファ
-                    else:
-                        print(f"    ⏱ API制限のため 30秒待機中...")
-                        time.sleep(30)
-                else:
-                    print(f"    ⏱ API制限のため 60秒待機中...")
-                    time.sleep(60)
+            # Quota制限の場合（次の limiter.acquire で待機する）
+            delay_time = limiter.backoff(e)
+            if delay_time is not None:
+                print(f"    ⏱ API制限のため {delay_time:.1f}秒待機中...")
             else:
                 # その他のエラーの場合
                 if attempt < max_retries - 1:
@@ -138,7 +94,7 @@ def generate_content(model, celebrities, topic, article_summary, article_content
     return None
 
 
-def generate_for_topic(model, topic):
+def generate_for_topic(model, limiter, topic):
     """トピックのコンテンツを生成"""
     topic_id = topic['id']
     celebrities = topic['celebrities']
@@ -162,7 +118,7 @@ def generate_for_topic(model, topic):
     
     # コンテンツ生成
     print(f"  AIでコンテンツ生成中...")
-    content = generate_content(model, celebrities, topic_text, article_summary, article_content)
+    content = generate_content(model, limiter, celebrities, topic_text, article_summary, article_content)
     
     if content:
         print(f"  ✓ タイトル: {content['title']}")
@@ -173,14 +129,20 @@ def generate_for_topic(model, topic):
         return None
 
 
+def apply_generated_content(topic, content):
+    """生成したコンテンツでトピック情報を更新"""
+    topic['generated_title'] = content['title']
+    topic['generated_post_text'] = content['post_text']
+    topic['status'] = 'content_generated'
+
+
 def main():
     print("=" * 60)
     print("コンテンツ生成ツール 起動")
     print("=" * 60)
     
     # 設定とデータ読み込み
-    config = load_config()
-    data = load_data()
+    data = get_data()
     
     # 未処理のトピックを抽出（status='image_downloaded' かつ generated_titleが空）
     pending_topics = [t for t in data if t['status'] == 'image_downloaded' and not t.get('generated_title')]
@@ -194,20 +156,18 @@ def main():
     
     # API初期化
     print("\n[1] API初期化中...")
-    gemini_model = init_gemini_api(config)
+    gemini_model = get_model()
     print("✓ 初期化完了")
     
     # 各トピックのコンテンツを生成
     print("\n[2] コンテンツ生成開始...")
     
+    limiter = get_rate_limiter()
     for topic in pending_topics:
-        content = generate_for_topic(gemini_model, topic)
+        content = generate_for_topic(gemini_model, limiter, topic)
         
         if content:
-            # トピック情報を更新
-            topic['generated_title'] = content['title']
-            topic['generated_post_text'] = content['post_text']
-            topic['status'] = 'content_generated'
+            apply_generated_content(topic, content)
             print(f"  ✓ 完了")
         else:
             print(f"  ✗ スキップ")
@@ -9,111 +9,29 @@
 - スマホ・モバイルファーストなデザイン
 """
 
-import json
+import functools
+import hashlib
 import os
 import shutil
+import threading
 import html
+from concurrent.futures import ThreadPoolExecutor
+from common import get_config, get_data, save_config
 
-CONFIG_FILE = 'config.json'
+# LPを並行して生成するスレッド数（ファイルのコピー・書き込み待ちを重ねる）
+LP_WORKERS = min(16, (os.cpu_count() or 1) * 4)
 
-def load_config():
-    """設定ファイルを読み込む"""
-    with open(CONFIG_FILE, 'r', encoding='utf-8') as f:
-        return json.load(f)
+# 生成済みLPのキャッシュ（docs 内のフォルダ）
+LP_CACHE_DIR = '.cache'
 
-def save_config(config):
-    """設定ファイルを保存する"""
-    with open(CONFIG_FILE, 'w', encoding='utf-8') as f:
-        json.dump(config, f, ensure_ascii=False, indent=2)
+# トピックごとの前回生成時の内容ハッシュ（docs 内のフォルダ）
+LP_HASH_DIR = '.hash'
 
-def check_and_setup_github_url(config):
-    """
-    GitHub PagesのURL設定を確認し、未設定ならユーザーに入力させて保存する
-    """
-    # github_pagesキーがない、またはbase_urlが空の場合
-    if 'github_pages' not in config or not config['github_pages'].get('base_url'):
-        print("\n" + "!" * 60)
-        print("【初期設定】GitHub PagesのURLを設定します")
-        print("X投稿用に、あなたのGitHub PagesのURLを特定する必要があります。")
-        print("!" * 60 + "\n")
-
-        username = input("GitHubのユーザー名を入力してください (例: user123): ").strip()
-        repo_name = input("このリポジトリ名を入力してください (例: gossip-news): ").strip()
-
-        if username and repo_name:
-            # URLを生成 (末尾にスラッシュをつける)
-            base_url = f"https://{username}.github.io/{repo_name}/"
-            
-            # configを更新
-            if 'github_pages' not in config:
-                config['github_pages'] = {}
-            config['github_pages']['base_url'] = base_url
-            
-            # 保存
-            save_config(config)
-            print(f"\n✓ 設定を保存しました: {base_url}")
-            print("※ config.json が更新されました\n")
-            return base_url
-        else:
-            print("⚠ 入力が正しくありません。今回はスキップします。")
-            return ""
-    
-    return config['github_pages']['base_url']
-
-def load_data():
-    """データファイルを読み込む"""
-    config = load_config()
-    data_file = config['paths']['data_file']
-    
-    if os.path.exists(data_file):
-        with open(data_file, 'r', encoding='utf-8') as f:
-            return json.load(f)
-    return []
-
-def setup_docs_dir():
-    """docsディレクトリの初期化"""
-    docs_dir = './docs'
-    images_dir = './docs/images'
-    
-    os.makedirs(docs_dir, exist_ok=True)
-    os.makedirs(images_dir, exist_ok=True)
-    
-    return docs_dir
-
-def copy_image(src_path, dest_folder):
-    """画像をdocs用フォルダにコピー"""
-    if not src_path or not os.path.exists(src_path):
-        return None
-    
-    filename = os.path.basename(src_path)
-    dest_path = os.path.join(dest_folder, 'images', filename)
-    
-    shutil.copy2(src_path, dest_path)
-    return f"./images/{filename}"
+# LP書き出し時のバッファサイズ
+LP_WRITE_BUFFER = 64 * 1024
 
-def generate_lp_html(topic, affiliate_link, dest_folder):
-    """画像メインのシンプルLP HTMLを生成"""
-    
-    title = html.escape(topic.get('generated_title', topic['article_title']))
-    
-    # 画像リスト準備
-    image_paths = []
-    if topic.get('downloaded_image'):
-        image_paths.append(topic['downloaded_image'])
-    if topic.get('additional_images'):
-        image_paths.extend(topic['additional_images'])
-    
-    # 画像コピー処理
-    html_images = []
-    for img in image_paths:
-        new_path = copy_image(img, dest_folder)
-        if new_path:
-            html_images.append(new_path)
-
-    if not html_images:
-        return None
-
-    html_content = f"""<!DOCTYPE html>
+# LPのHTMLテンプレート（ページごとに変わるのはタイトル・画像・リンクのみ）
+_LP_HEAD_TMPL = """<!DOCTYPE html>
 <html lang="ja">
 <head>
     <meta charset="UTF-8">
@@ -222,8 +140,8 @@ def generate_lp_html(topic, affiliate_link, dest_folder):
         </div>
         <div class="gallery">
 """
-    for img_src in html_images:
-        html_content += f"""
+
+_LP_IMAGE_CARD_TMPL = """
             <div class="image-card">
                 <a href="{affiliate_link}" target="_blank">
                     <img src="{img_src}" alt="画像">
@@ -231,7 +149,8 @@ def generate_lp_html(topic, affiliate_link, dest_folder):
                 </a>
             </div>
 """
-    html_content += f"""
+
+_LP_FOOTER_TMPL = """
         </div>
         <div class="action-area">
             <a href="{affiliate_link}" target="_blank" class="cta-button">
@@ -242,22 +161,247 @@ def generate_lp_html(topic, affiliate_link, dest_folder):
 </body>
 </html>
 """
-    return html_content
 
-def generate_admin_list(pages, base_url):
-    """自分用管理画面"""
-    html = """<!DOCTYPE html>
+# 管理画面（docs/index.html）のテンプレート
+_ADMIN_HEAD = """<!DOCTYPE html>
 <html><head><meta charset="utf-8"><meta name="viewport" content="width=device-width,initial-scale=1">
 <title>生成されたページ一覧</title>
 <style>body{font-family:sans-serif;padding:20px;background:#f0f0f0} li{background:white;margin:10px 0;padding:15px;list-style:none;border-radius:8px;box-shadow:0 2px 4px rgba(0,0,0,0.1)} a{text-decoration:none;color:#007bff;font-weight:bold;font-size:1.1em;display:block} span{display:block;color:#666;font-size:0.8em;margin-top:5px;word-break:break-all;}</style>
 </head><body>
 <h2>生成されたページ一覧 (Admin用)</h2>
 <ul>"""
-    for p in pages:
-        full_url = f"{base_url}{p['filename']}" if base_url else "URL設定未完了"
-        html += f'<li><a href="{p["filename"]}">{p["title"]}</a><span>Public URL: {full_url}</span></li>'
-    html += "</ul></body></html>"
-    return html
+
+_ADMIN_ITEM_TMPL = '<li><a href="{filename}">{title}</a><span>Public URL: {full_url}</span></li>'
+
+_ADMIN_FOOT = "</ul></body></html>"
+
+# テンプレートのハッシュ（テンプレートを変更したら生成済みLPのキャッシュを使わない）
+_LP_TEMPLATE_HASH = hashlib.blake2b(
+    (_LP_HEAD_TMPL + _LP_IMAGE_CARD_TMPL + _LP_FOOTER_TMPL).encode('utf-8'), digest_size=8).hexdigest()
+
+def check_and_setup_github_url(config):
+    """
+    GitHub PagesのURL設定を確認し、未設定ならユーザーに入力させて保存する
+    """
+    # github_pagesキーがない、またはbase_urlが空の場合
+    if 'github_pages' not in config or not config['github_pages'].get('base_url'):
+        print("\n" + "!" * 60)
+        print("【初期設定】GitHub PagesのURLを設定します")
+        print("X投稿用に、あなたのGitHub PagesのURLを特定する必要があります。")
+        print("!" * 60 + "\n")
+
+        username = input("GitHubのユーザー名を入力してください (例: user123): ").strip()
+        repo_name = input("このリポジトリ名を入力してください (例: gossip-news): ").strip()
+
+        if username and repo_name:
+            # URLを生成 (末尾にスラッシュをつける)
+            base_url = f"https://{username}.github.io/{repo_name}/"
+            
+            # configを更新
+            if 'github_pages' not in config:
+                config['github_pages'] = {}
+            config['github_pages']['base_url'] = base_url
+            
+            # 保存
+            save_config(config)
+            print(f"\n✓ 設定を保存しました: {base_url}")
+            print("※ config.json が更新されました\n")
+            return base_url
+        else:
+            print("⚠ 入力が正しくありません。今回はスキップします。")
+            return ""
+    
+    return config['github_pages']['base_url']
+
+def setup_docs_dir():
+    """docsディレクトリの初期化"""
+    docs_dir = './docs'
+    images_dir = './docs/images'
+    
+    os.makedirs(docs_dir, exist_ok=True)
+    os.makedirs(images_dir, exist_ok=True)
+    os.makedirs(os.path.join(docs_dir, LP_CACHE_DIR), exist_ok=True)
+    os.makedirs(os.path.join(docs_dir, LP_HASH_DIR), exist_ok=True)
+    
+    return docs_dir
+
+def link_file(src_path, dest_path):
+    """
+    ファイルをハードリンクで配置（できない場合はコピー）
+    
+    既に同じファイルなら何もしない。スレッドごとの一時ファイルに配置してから
+    置き換えるので、同じファイルを複数スレッドから同時に配置しても壊れない
+    """
+    if os.path.exists(dest_path) and os.path.samefile(src_path, dest_path):
+        return
+    tmp_path = f"{dest_path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    try:
+        try:
+            os.link(src_path, tmp_path)
+        except OSError:
+            # 別のファイルシステム（EXDEV）やリンク非対応の場合はコピー（更新日時などは不要）
+            shutil.copyfile(src_path, tmp_path)
+        os.replace(tmp_path, dest_path)
+    except BaseException:
+        if os.path.lexists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+@functools.cache
+def copy_image(src_path, dest_folder):
+    """
+    画像をdocs用フォルダにコピー
+    
+    同じファイルシステム上ならハードリンクを作成し（データはコピーしない）、
+    できない場合のみ中身をコピーする。再実行時に既に同じファイルならそのまま使う
+    複数トピックで同じ画像を使う場合も、コピーは1回の実行につき1回だけ
+    （main() の開始時にメモをクリアする）
+    """
+    if not src_path:
+        return None
+    
+    filename = os.path.basename(src_path)
+    dest_path = os.path.join(dest_folder, 'images', filename)
+    
+    # 存在確認はせずにそのまま配置し、元画像がなければ失敗として扱う
+    try:
+        link_file(src_path, dest_path)
+    except OSError:
+        return None
+    return f"./images/{filename}"
+
+def stage_images(topic, dest_folder):
+    """
+    トピックの画像をdocs用フォルダに配置
+    
+    Returns:
+        list: LPから参照する画像パス（配置できた画像のみ）
+    """
+    image_paths = []
+    if topic.get('downloaded_image'):
+        image_paths.append(topic['downloaded_image'])
+    if topic.get('additional_images'):
+        image_paths.extend(topic['additional_images'])
+    
+    html_images = []
+    for img in image_paths:
+        new_path = copy_image(img, dest_folder)
+        if new_path:
+            html_images.append(new_path)
+    return html_images
+
+def write_lp_html(topic, affiliate_link, html_images, dest_folder, out_path):
+    """
+    画像メインのシンプルLP HTMLを生成してファイルに書き出す
+    
+    HTML全体を1つの文字列にせず、部品ごとにバッファ付きで書き込む
+    生成結果は docs/.cache に内容のハッシュで保存し、内容が変わらなければ
+    再生成せずにリンクするだけにする
+    
+    Returns:
+        bool: 書き出した場合 True（配置できた画像がなければ False）
+    """
+    
+    title = html.escape(topic.get('generated_title', topic['article_title']))
+    
+    if not html_images:
+        return False
+
+    # 同じ内容のLPを生成済みならそれを使う
+    cache_key = hashlib.blake2b(
+        f"{_LP_TEMPLATE_HASH}|{title}|{affiliate_link}|{','.join(html_images)}".encode('utf-8'),
+        digest_size=16).hexdigest()
+    cache_path = os.path.join(dest_folder, LP_CACHE_DIR, f"{cache_key}.html")
+    
+    if not os.path.exists(cache_path):
+        # 属性値に埋め込む値は1回だけエスケープして使い回す
+        affiliate_attr = html.escape(affiliate_link, quote=True)
+        
+        tmp_path = f"{cache_path}.{os.path.basename(out_path)}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8', buffering=LP_WRITE_BUFFER) as f:
+            f.write(_LP_HEAD_TMPL.format(title=title))
+            for img_src in html_images:
+                f.write(_LP_IMAGE_CARD_TMPL.format(
+                    affiliate_link=affiliate_attr, img_src=html.escape(img_src, quote=True)))
+            f.write(_LP_FOOTER_TMPL.format(affiliate_link=affiliate_attr))
+        os.replace(tmp_path, cache_path)
+    
+    link_file(cache_path, out_path)
+    return True
+
+def generate_admin_list(pages, base_url):
+    """自分用管理画面"""
+    # base_url は全ページ共通なので1回だけエスケープ
+    base_url_text = html.escape(base_url) if base_url else ""
+    
+    def page_item(p):
+        filename = html.escape(p['filename'], quote=True)
+        full_url = f"{base_url_text}{filename}" if base_url else "URL設定未完了"
+        return _ADMIN_ITEM_TMPL.format(filename=filename, title=html.escape(p['title']), full_url=full_url)
+    
+    return _ADMIN_HEAD + "".join(page_item(p) for p in pages) + _ADMIN_FOOT
+
+def prune_lp_cache(docs_dir):
+    """
+    どのLPからもリンクされていないキャッシュを削除
+    
+    docs/<id>.html はキャッシュへのハードリンクなので、リンク数が1のものは
+    タイトル・画像などが変わって使われなくなったキャッシュ
+    
+    Returns:
+        int: 削除した件数
+    """
+    cache_dir = os.path.join(docs_dir, LP_CACHE_DIR)
+    removed = 0
+    with os.scandir(cache_dir) as entries:
+        for entry in entries:
+            if entry.name.endswith('.html') and entry.stat().st_nlink == 1:
+                os.remove(entry.path)
+                removed += 1
+    return removed
+
+def _process_topic(topic, affiliate_link, docs_dir):
+    """
+    1トピックのLPを生成して書き出す
+    
+    Returns:
+        dict or None: 生成したページ情報（title, filename）
+    """
+    if not topic.get('generated_title') or not topic.get('downloaded_image'):
+        return None
+        
+    filename = f"{topic['id']}.html"
+    file_path = os.path.join(docs_dir, filename)
+    page = {
+        'title': topic['generated_title'],
+        'filename': filename
+    }
+    
+    # 画像は毎回配置する（既に同じファイルなら確認のみ。docs/images から消えた画像も戻す）
+    html_images = stage_images(topic, docs_dir)
+    
+    # 前回の生成時から内容が変わっていなければ、HTMLの書き出しは行わない
+    # （配置できた画像の一覧もハッシュに含め、元画像が消えた場合は作り直す）
+    topic_hash = hashlib.blake2b(repr((
+        _LP_TEMPLATE_HASH, topic['id'], topic.get('generated_title'), html_images,
+        affiliate_link)).encode('utf-8'), digest_size=16).hexdigest()
+    hash_path = os.path.join(docs_dir, LP_HASH_DIR, topic['id'])
+    try:
+        with open(hash_path, 'r', encoding='utf-8') as f:
+            if f.read() == topic_hash and os.path.exists(file_path):
+                return page
+    except FileNotFoundError:
+        pass
+    
+    print(f"  Generating: {filename} ...")
+    
+    if not write_lp_html(topic, affiliate_link, html_images, docs_dir, file_path):
+        return None
+    
+    with open(hash_path, 'w', encoding='utf-8') as f:
+        f.write(topic_hash)
+    
+    return page
 
 def main():
     print("=" * 60)
@@ -265,40 +409,34 @@ def main():
     print("=" * 60)
     
     # 設定読み込み & URL自動設定ウィザード
-    config = load_config()
+    config = get_config()
     base_url = check_and_setup_github_url(config)
+    # 公開URLの組み立て用に末尾の '/' を1回だけ補う
+    if base_url and not base_url.endswith('/'):
+        base_url += '/'
     
     affiliate_link = config['tiktok_lite']['invite_link']
     if not affiliate_link:
         print("Error: config.jsonにtiktok_lite.invite_linkが設定されていません")
         return
 
-    data = load_data()
+    data = get_data()
     docs_dir = setup_docs_dir()
     
-    generated_pages = []
+    # 画像コピーのメモは1回の実行の間だけ有効（前回の実行以降に消えた・増えた画像を反映する）
+    copy_image.cache_clear()
     
     print("\n[1] 各トピックのLPを生成中...")
     
-    for topic in data:
-        if not topic.get('generated_title') or not topic.get('downloaded_image'):
-            continue
-            
-        filename = f"{topic['id']}.html"
-        file_path = os.path.join(docs_dir, filename)
-        
-        print(f"  Generating: {filename} ...")
-        
-        html_content = generate_lp_html(topic, affiliate_link, docs_dir)
-        
-        if html_content:
-            with open(file_path, 'w', encoding='utf-8') as f:
-                f.write(html_content)
-            
-            generated_pages.append({
-                'title': topic['generated_title'],
-                'filename': filename
-            })
+    # トピックごとに出力ファイルは別なので、ロックなしで並行して書き出せる
+    with ThreadPoolExecutor(max_workers=LP_WORKERS) as executor:
+        futures = [executor.submit(_process_topic, topic, affiliate_link, docs_dir) for topic in data]
+        generated_pages = [page for page in (future.result() for future in futures) if page]
+    
+    # 使われなくなったLPのキャッシュを削除
+    removed = prune_lp_cache(docs_dir)
+    if removed:
+        print(f"  🗑️ 使われていないキャッシュを削除: {removed}件")
 
     # 管理用インデックス作成
     with open(os.path.join(docs_dir, 'index.html'), 'w', encoding='utf-8') as f:
@@ -9,61 +9,90 @@
 - X APIで投稿を実行
 """
 
-import json
+import asyncio
+import functools
+import sys
 from datetime import datetime
 import tweepy
+from common import append_journal, get_config, get_data, has_pending_journal, save_data
 
+SEP = "=" * 60
 
-def load_config():
-    """設定ファイルを読み込む"""
-    with open('config.json', 'r', encoding='utf-8') as f:
-        return json.load(f)
+# 同時に投稿するトピック数（X APIのレート制限に配慮）
+POST_CONCURRENCY = 5
 
+# X の文字数上限（重み付き。日本語などは1文字2、半角英数字などは1として数える）
+TWEET_MAX_WEIGHT = 280
+# URL（t.co 短縮で常に23文字）+ 改行2つ
+URL_RESERVE = 23 + 2
+# 投稿文に使える文字数
+POST_TEXT_BUDGET = TWEET_MAX_WEIGHT - URL_RESERVE
+# 重み1として数える文字コードの範囲（それ以外は重み2）
+_LIGHT_WEIGHT_RANGES = ((0, 4351), (8192, 8205), (8208, 8223), (8242, 8247))
+ELLIPSIS = "…"
 
-def load_data():
-    """データファイルを読み込む"""
-    config = load_config()
-    data_file = config['paths']['data_file']
-    
-    with open(data_file, 'r', encoding='utf-8') as f:
-        return json.load(f)
-
-
-def save_data(data):
-    """データファイルに保存"""
-    config = load_config()
-    data_file = config['paths']['data_file']
-    
-    with open(data_file, 'w', encoding='utf-8') as f:
-        json.dump(data, f, ensure_ascii=False, indent=2)
-    print(f"✓ データを保存しました")
+# 承認確認の入力と結果（True=投稿 / False=スキップ / None=終了）
+APPROVAL_CHOICES = {'y': True, 'n': False, 'q': None}
 
 
 def init_x_api(config):
-    """X API v2クライアントを初期化"""
+    """X API v2クライアントを初期化（同じ認証情報なら同じクライアントを使い回す）"""
     # config.jsonのキーに合わせて x_post_api を使用
     api_config = config['x_post_api']
     
-    client = tweepy.Client(
-        bearer_token=api_config['bearer_token'],
-        consumer_key=api_config['api_key'],
-        consumer_secret=api_config['api_secret'],
-        access_token=api_config['access_token'],
-        access_token_secret=api_config['access_token_secret']
+    return _get_x_client(
+        api_config['bearer_token'],
+        api_config['api_key'],
+        api_config['api_secret'],
+        api_config['access_token'],
+        api_config['access_token_secret']
+    )
+
+
+@functools.lru_cache(maxsize=1)
+def _get_x_client(bearer_token, api_key, api_secret, access_token, access_token_secret):
+    """X API v2クライアントを作成（接続は main() を繰り返し呼んでも再利用される）"""
+    return tweepy.Client(
+        bearer_token=bearer_token,
+        consumer_key=api_key,
+        consumer_secret=api_secret,
+        access_token=access_token,
+        access_token_secret=access_token_secret
     )
-    return client
 
 
 def generate_page_url(base_url, topic_id):
-    """トピックIDからGitHub PagesのURLを生成"""
-    if not base_url.endswith('/'):
-        base_url += '/'
+    """トピックIDからGitHub PagesのURLを生成（base_url は末尾が '/' のもの）"""
     return f"{base_url}{topic_id}.html"
 
 
+def char_weight(char):
+    """X の文字数カウントでの1文字の重み"""
+    code = ord(char)
+    for low, high in _LIGHT_WEIGHT_RANGES:
+        if low <= code <= high:
+            return 1
+    return 2
+
+
+def truncate_post_text(post_text, budget=POST_TEXT_BUDGET):
+    """投稿文を重み付き文字数 budget 以内に収める（超える場合のみ末尾を「…」にする）"""
+    weights = [char_weight(char) for char in post_text]
+    if sum(weights) <= budget:
+        return post_text
+    
+    limit = budget - char_weight(ELLIPSIS)
+    total = 0
+    for i, weight in enumerate(weights):
+        total += weight
+        if total > limit:
+            return post_text[:i] + ELLIPSIS
+    return post_text
+
+
 def post_to_twitter(client, topic, base_url):
     """
-    Xに投稿
+    Xに投稿（並行して呼ばれるため、ログには [topic_id] を付ける）
     """
     topic_id = topic['id']
     post_text = topic['generated_post_text']
@@ -71,31 +100,29 @@ def post_to_twitter(client, topic, base_url):
     # サイトURLを生成
     site_url = generate_page_url(base_url, topic_id)
     
-    print(f"\n  トピックID: {topic_id}")
-    print(f"  投稿文: {post_text}")
-    print(f"  URL: {site_url}")
+    print(f"\n  [{topic_id}] 投稿文: {post_text}")
+    print(f"  [{topic_id}] URL: {site_url}")
     
-    # 投稿テキストを作成
-    full_text = f"{post_text}\n\n{site_url}"
+    # 文字数チェック（URLは長さに関係なく23文字換算なので、投稿文のみ数える）
+    fitted_text = truncate_post_text(post_text)
+    if fitted_text != post_text:
+        print(f"  ⚠ [{topic_id}] 文字数調整中...")
     
-    # 文字数チェック (URLは23文字換算されるが、余裕を見て判定)
-    if len(full_text) > 280:
-        print(f"  ⚠ 文字数調整中...")
-        max_text_len = 280 - 25 - 5  # URL分 + 改行分余裕
-        full_text = f"{post_text[:max_text_len]}...\n\n{site_url}"
+    # 投稿テキストを作成
+    full_text = f"{fitted_text}\n\n{site_url}"
     
     try:
-        print(f"  🚀 投稿中...")
+        print(f"  🚀 [{topic_id}] 投稿中...")
         response = client.create_tweet(text=full_text)
         
         tweet_id = response.data['id']
         tweet_url = f"https://x.com/i/status/{tweet_id}"
         
-        print(f"  ✓ 投稿成功: {tweet_url}")
+        print(f"  ✓ [{topic_id}] 投稿成功: {tweet_url}")
         return tweet_id
     
     except Exception as e:
-        print(f"  ✗ 投稿エラー: {e}")
+        print(f"  ✗ [{topic_id}] 投稿エラー: {e}")
         return None
 
 
@@ -103,32 +130,72 @@ def approve_topic_interactive(topic, base_url):
     """対話的にトピックを確認・承認"""
     site_url = generate_page_url(base_url, topic['id'])
     
-    print("\n" + "=" * 60)
-    print(f"トピックID: {topic['id']}")
-    print(f"タイトル: {topic.get('generated_title', 'タイトルなし')}")
-    print(f"投稿文: {topic.get('generated_post_text', 'テキストなし')}")
-    print(f"リンク先: {site_url}")
-    print("=" * 60)
+    # 確認内容はまとめて1回で出力
+    sys.stdout.write("\n".join([
+        "",
+        SEP,
+        f"トピックID: {topic['id']}",
+        f"タイトル: {topic.get('generated_title', 'タイトルなし')}",
+        f"投稿文: {topic.get('generated_post_text', 'テキストなし')}",
+        f"リンク先: {site_url}",
+        SEP,
+        "",
+    ]))
+    sys.stdout.flush()
     
     while True:
         choice = input("\n投稿しますか? (y=はい / n=スキップ / q=終了): ").lower()
-        if choice == 'y':
-            return True
-        elif choice == 'n':
+        if choice in APPROVAL_CHOICES:
+            return APPROVAL_CHOICES[choice]
+        print("y, n, qのいずれかを入力してください")
+
+
+async def post_topics(client, topics, base_url):
+    """
+    承認済みトピックを並行して投稿（同時投稿数は POST_CONCURRENCY まで）
+    
+    Returns:
+        int: 投稿に成功した件数
+    """
+    semaphore = asyncio.Semaphore(POST_CONCURRENCY)
+    
+    async def bounded(topic):
+        async with semaphore:
+            tweet_id = await asyncio.to_thread(post_to_twitter, client, topic, base_url)
+        
+        if not tweet_id:
             return False
-        elif choice == 'q':
-            return None
-        else:
-            print("y, n, qのいずれかを入力してください")
+        
+        # データ更新
+        posted = {
+            'id': topic['id'],
+            'posted_tweet_id': tweet_id,
+            'status': 'posted',
+            'posted_at': datetime.now().isoformat(),
+            'final_url': generate_page_url(base_url, topic['id'])
+        }
+        topic.update(posted)
+        
+        # 1件ごとにジャーナルへ追記（中断しても次回の読み込み時に反映される）
+        append_journal(posted)
+        return True
+    
+    results = await asyncio.gather(*(bounded(topic) for topic in topics))
+    return sum(results)
+
+
+def is_ready_to_post(topic):
+    """投稿対象か（'content_generated' かつ未投稿）"""
+    return topic['status'] == 'content_generated' and not topic.get('posted_tweet_id')
 
 
 def main():
-    print("=" * 60)
+    print(SEP)
     print("X投稿ツール (GitHub Pages版) 起動")
-    print("=" * 60)
+    print(SEP)
     
-    config = load_config()
-    data = load_data()
+    config = get_config()
+    data = get_data()
     
     # GitHub PagesのURL設定チェック
     if 'github_pages' not in config or 'base_url' not in config['github_pages']:
@@ -137,21 +204,21 @@ def main():
         return
 
     base_url = config['github_pages']['base_url']
+    # URL生成のたびに確認しなくて済むよう、末尾の '/' はここで1回だけ補う
+    if not base_url.endswith('/'):
+        base_url += '/'
 
     # 投稿対象: 'content_generated' (LP作成済) かつ 未投稿のもの
     # ※ generate_lp.py でstatus更新していない場合は content_generated のままなのでこれを対象にする
-    ready_topics = [
-        t for t in data 
-        if t['status'] == 'content_generated' 
-        and not t.get('posted_tweet_id')
-    ]
+    # 件数だけ先に数え、対象トピックのリストは作らない
+    ready_count = sum(1 for t in data if is_ready_to_post(t))
     
-    if not ready_topics:
+    if not ready_count:
         print("\n投稿可能な新しいトピックがありません。")
         print("※ generate.py でコンテンツ生成済みか確認してください。")
         return
     
-    print(f"\n投稿候補: {len(ready_topics)}件のトピック")
+    print(f"\n投稿候補: {ready_count}件のトピック")
     
     # API初期化
     print("\n[1] X API初期化中...")
@@ -162,39 +229,41 @@ def main():
         print(f"✗ API初期化エラー: {e}")
         return
     
-    # 各トピックを確認して投稿
-    print("\n[2] 投稿処理開始...")
+    # 各トピックを確認（投稿はすべて確認してからまとめて行う）
+    print("\n[2] 投稿内容の確認...")
     
-    posted_count = 0
-    
-    for topic in ready_topics:
+    to_post = []
+    for topic in (t for t in data if is_ready_to_post(t)):
         # 手動確認
         approval = approve_topic_interactive(topic, base_url)
         
         if approval is None:
-            print("\n処理を中断します")
+            print("\n確認を中断します（承認済みのトピックは投稿します）")
             break
         elif not approval:
             print("スキップしました")
             continue
         
-        # 投稿実行
-        tweet_id = post_to_twitter(x_client, topic, base_url)
-        
-        if tweet_id:
-            # データ更新
-            topic['posted_tweet_id'] = tweet_id
-            topic['status'] = 'posted'
-            topic['posted_at'] = datetime.now().isoformat()
-            topic['final_url'] = generate_page_url(base_url, topic['id'])
-            posted_count += 1
-            
-            # 1件ごとに保存（安全のため）
+        to_post.append(topic)
+    
+    if not to_post:
+        print("\n投稿するトピックがありません。")
+        return
+    
+    print(f"\n[3] 投稿処理開始... ({len(to_post)}件)")
+    
+    posted_count = 0
+    
+    try:
+        posted_count = asyncio.run(post_topics(x_client, to_post, base_url))
+    finally:
+        # データ保存は最後に1回だけ（Ctrl+C で中断した場合も保存）
+        if posted_count > 0 or has_pending_journal():
             save_data(data)
     
-    print("\n" + "=" * 60)
+    print("\n" + SEP)
     print(f"処理完了: {posted_count}件を投稿しました")
-    print("=" * 60)
+    print(SEP)
 
 
 if __name__ == '__main__':
@@ -6,25 +6,20 @@
 全ツールを順次実行する自動化スクリプト
 """
 
-import subprocess
-import sys
+from common import load_tool
 
 
-def run_script(script_name, description):
-    """スクリプトを実行"""
+def run_tool(filename, description):
+    """ツールを同じプロセス内で実行（設定・データ・APIクライアントは共有される）"""
     print("\n" + "=" * 80)
     print(f"実行: {description}")
     print("=" * 80)
     
     try:
-        result = subprocess.run(
-            [sys.executable, script_name],
-            check=True,
-            capture_output=False
-        )
+        load_tool(filename).main()
         print(f"\n✓ {description} 完了")
         return True
-    except subprocess.CalledProcessError as e:
+    except Exception as e:
         print(f"\n✗ {description} 失敗")
         print(f"エラー: {e}")
         return False
@@ -37,16 +32,15 @@ def main():
     
     # ツール実行順序
     tools = [
-        ("monitor_rss.py", "ツール1: RSS監視 - 芸能人ゴシップ検出"),
-        ("download_images.py", "ツール2: 画像ダウンロード"),
-        ("upscale.py", "ツール3: 画像高解像度化"),
-        ("generate.py", "ツール4: コンテンツ生成"),
-        ("onelink.py", "ツール5: OneLinkサイト作成"),
+        ("1,まとめサイトRSS監視ツール.py", "ツール1: RSS監視 - 芸能人ゴシップ検出"),
+        ("2,画像ダウンロードツール.py", "ツール2: 画像ダウンロード"),
+        ("3,タイトルツイート生成.py", "ツール3: コンテンツ生成"),
+        ("4,サイト作成.py", "ツール4: サイト作成"),
     ]
     
     # 各ツールを順次実行
-    for script, description in tools:
-        success = run_script(script, description)
+    for filename, description in tools:
+        success = run_tool(filename, description)
         
         if not success:
             print(f"\n処理を中断します: {description} でエラーが発生しました")
@@ -58,9 +52,9 @@ def main():
     print("\n次のステップ:")
     print("1. detected_topics.json を確認してください")
     print("2. 各トピックの内容を目視でチェック")
-    print("3. 問題なければ post_to_x.py を実行して投稿")
+    print("3. 問題なければ 5,X投稿ツール.py を実行して投稿")
     print("\nコマンド:")
-    print("  python post_to_x.py")
+    print("  python 5,X投稿ツール.py")
     print("=" * 80)
 
 
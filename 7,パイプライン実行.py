@@ -0,0 +1,123 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+パイプライン実行 (pipeline.py)
+
+ツール1〜3（RSS監視 → 画像ダウンロード → コンテンツ生成）を1プロセスで実行する
+
+機能:
+- 検出したトピックから順に画像ダウンロード・コンテンツ生成へ流す（キューで接続）
+- 前回までに処理しきれなかったトピックも途中の工程から再開
+- 設定・データの読み込み、Gemini APIの初期化とレート制限は全工程で共有
+- データの保存は最後に1回だけ
+"""
+
+import asyncio
+import os
+from common import get_config, get_data, get_model, get_rate_limiter, load_tool, save_data
+
+rss_monitor = load_tool('1,まとめサイトRSS監視ツール.py')
+image_downloader = load_tool('2,画像ダウンロードツール.py')
+content_generator = load_tool('3,タイトルツイート生成.py')
+
+# 画像ダウンロードを並行処理するトピック数
+IMAGE_WORKERS = image_downloader.TOPIC_CONCURRENCY
+
+
+async def image_worker(image_queue, content_queue, config, model, limiter, stats):
+    """画像ダウンロード工程: 成功したトピックをコンテンツ生成へ渡す"""
+    while (topic := await image_queue.get()) is not None:
+        try:
+            if await image_downloader.process_topic(topic, config, model, limiter):
+                stats['images'] += 1
+                await content_queue.put(topic)
+        except Exception as e:
+            print(f"  ✗ [{topic['id']}] 画像処理エラー: {e}")
+
+
+async def content_worker(content_queue, model, limiter, stats):
+    """コンテンツ生成工程（生成は同期APIのため1件ずつスレッドで実行）"""
+    while (topic := await content_queue.get()) is not None:
+        try:
+            content = await asyncio.to_thread(
+                content_generator.generate_for_topic, model, limiter, topic)
+            if content:
+                content_generator.apply_generated_content(topic, content)
+                stats['contents'] += 1
+                print(f"  ✓ [{topic['id']}] コンテンツ生成完了")
+            else:
+                print(f"  ✗ [{topic['id']}] スキップ")
+        except Exception as e:
+            print(f"  ✗ [{topic['id']}] コンテンツ生成エラー: {e}")
+
+
+async def run_pipeline(config, data, model, limiter):
+    """
+    RSS監視・画像ダウンロード・コンテンツ生成を並行して実行
+
+    Returns:
+        dict: 工程ごとの処理件数
+    """
+    stats = {'topics': 0, 'images': 0, 'contents': 0}
+    image_queue = asyncio.Queue()
+    content_queue = asyncio.Queue()
+
+    # 前回までに処理しきれなかったトピックは途中の工程から再開
+    for topic in data:
+        if topic['status'] == 'detected':
+            image_queue.put_nowait(topic)
+        elif topic['status'] == 'image_downloaded' and not topic.get('generated_title'):
+            content_queue.put_nowait(topic)
+
+    image_workers = [
+        asyncio.create_task(image_worker(image_queue, content_queue, config, model, limiter, stats))
+        for _ in range(IMAGE_WORKERS)
+    ]
+    content_task = asyncio.create_task(content_worker(content_queue, model, limiter, stats))
+
+    try:
+        stats['topics'] = await rss_monitor.detect_new_topics(
+            config, data, model, limiter, on_topic=image_queue.put)
+    finally:
+        # 検出が終わったら（失敗しても）キューに残ったトピックを処理しきって終了
+        for _ in image_workers:
+            await image_queue.put(None)
+        await asyncio.gather(*image_workers)
+        await content_queue.put(None)
+        await content_task
+
+    return stats
+
+
+def main():
+    print("=" * 60)
+    print("パイプライン実行 起動")
+    print("=" * 60)
+
+    # 設定とデータ読み込み
+    config = get_config()
+    data = get_data()
+
+    # API初期化
+    print("\n[1] Gemini APIを初期化中...")
+    gemini_model = get_model()
+    print("✓ API初期化完了")
+
+    # 画像フォルダ作成
+    os.makedirs('./images', exist_ok=True)
+
+    try:
+        stats = asyncio.run(run_pipeline(config, data, gemini_model, get_rate_limiter()))
+    finally:
+        # データ保存（途中で失敗しても処理済みの分は保存）
+        print("\n[4] データ保存中...")
+        save_data(data)
+
+    print("\n" + "=" * 60)
+    print(f"パイプライン完了: 新規トピック {stats['topics']}件 / "
+          f"画像 {stats['images']}件 / コンテンツ生成 {stats['contents']}件")
+    print("=" * 60)
+
+
+if __name__ == '__main__':
+    main()
\ No newline at end of file
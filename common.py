@@ -0,0 +1,240 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+共通処理 (common.py)
+
+機能:
+- config.json の読み込み（1プロセスにつき1回）・保存
+- detected_topics.json の読み込み・保存
+- Gemini APIの初期化（初回使用時のみ）
+- Gemini APIのレート制限（RPM・TPM）
+- 各ツールのスクリプトの読み込み（ファイル名が数字始まりのため import 文では読めない）
+"""
+
+import asyncio
+import functools
+import importlib.util
+import mmap
+import os
+import re
+import threading
+import time
+import orjson
+
+CONFIG_FILE = 'config.json'
+
+GEMINI_MODEL_NAME = 'gemini-2.0-flash-exp'
+
+# Gemini APIの1分あたりの上限（config.json の gemini_api.rpm / gemini_api.tpm で上書き可能）
+DEFAULT_GEMINI_RPM = 10
+DEFAULT_GEMINI_TPM = 1000000
+
+# API制限エラーメッセージ中の待機秒数
+_RETRY_DELAY_RE = re.compile(r'retry in (\d+(?:\.\d+)?)s')
+
+
+@functools.cache
+def get_config():
+    """設定ファイルを読み込む（初回のみ読み込み、以降はキャッシュを返す）"""
+    with open(CONFIG_FILE, 'rb') as f:
+        return orjson.loads(f.read())
+
+
+def save_config(config):
+    """設定ファイルを保存する（get_config() のキャッシュも同じdictを参照している）"""
+    with open(CONFIG_FILE, 'wb') as f:
+        f.write(orjson.dumps(config, option=orjson.OPT_INDENT_2))
+
+
+def get_journal_file(data_file):
+    """トピックの追加・更新の追記用ジャーナルファイルのパス"""
+    return f"{os.path.splitext(data_file)[0]}.journal.jsonl"
+
+
+def has_pending_journal():
+    """データファイルに未反映のジャーナルが残っているか"""
+    return os.path.exists(get_journal_file(get_config()['paths']['data_file']))
+
+
+def load_data():
+    """
+    データファイルを読み込む
+
+    前回の実行がデータ保存前に中断した場合は、ジャーナルに残った
+    トピックの追加・更新も取り込む
+    """
+    data_file = get_config()['paths']['data_file']
+    journal_file = get_journal_file(data_file)
+
+    data = []
+    if os.path.exists(data_file) and os.path.getsize(data_file) > 0:
+        # ファイルをメモリにマップしてそのまま解析（読み込み用のバッファを別に確保しない）
+        with open(data_file, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            with memoryview(mm) as view:
+                data = orjson.loads(view)
+
+    if os.path.exists(journal_file):
+        topics_by_id = {item['id']: item for item in data}
+        with open(journal_file, 'rb') as f:
+            for line in f:
+                if not line.strip():
+                    continue
+                record = orjson.loads(line)
+                if record['id'] in topics_by_id:
+                    # 既存トピックは記録された項目のみ更新
+                    topics_by_id[record['id']].update(record)
+                else:
+                    data.append(record)
+                    topics_by_id[record['id']] = record
+
+    return data
+
+
+@functools.cache
+def get_data():
+    """データを読み込む（同じプロセス内のツールで1つのリストを共有する）"""
+    return load_data()
+
+
+def append_journal(record):
+    """
+    トピックの追加・更新をジャーナルに1行追記（データ全体は書き直さない）
+
+    Args:
+        record: 新規トピック、または id と更新した項目のみのdict
+    """
+    journal_file = get_journal_file(get_config()['paths']['data_file'])
+
+    with open(journal_file, 'ab') as f:
+        f.write(orjson.dumps(record) + b'\n')
+
+
+def save_data(data):
+    """データファイルに保存（一時ファイルに書き出してから置き換える）"""
+    data_file = get_config()['paths']['data_file']
+    tmp_file = f"{data_file}.tmp"
+
+    with open(tmp_file, 'wb') as f:
+        f.write(orjson.dumps(data, option=orjson.OPT_INDENT_2))
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_file, data_file)
+
+    # 保存済みになったジャーナルを削除
+    journal_file = get_journal_file(data_file)
+    if os.path.exists(journal_file):
+        os.remove(journal_file)
+    print(f"✓ データを保存しました: {data_file}")
+
+
+@functools.cache
+def get_model():
+    """Gemini APIを初期化（google.generativeai は初回呼び出し時に読み込む）"""
+    import google.generativeai as genai
+
+    genai.configure(api_key=get_config()['gemini_api']['api_key'])
+    return genai.GenerativeModel(GEMINI_MODEL_NAME)
+
+
+class TokenBucket:
+    """
+    トークンバケット方式のレート制限
+
+    上限に余裕があれば待たずに通し、超える場合だけ必要な秒数待機する。
+    スレッド・asyncio のどちらからも共有できる。
+    """
+
+    def __init__(self, rate, period=60.0):
+        self.capacity = rate
+        self.fill_rate = rate / period
+        self._tokens = rate
+        self._updated_at = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated_at) * self.fill_rate)
+        self._updated_at = now
+
+    def _reserve(self, amount):
+        """トークンを予約し、使えるようになるまでの待機秒数を返す"""
+        with self._lock:
+            self._refill()
+            self._tokens -= min(amount, self.capacity)
+            return max(0.0, -self._tokens / self.fill_rate)
+
+    def acquire(self, amount=1):
+        """トークンを取得（足りなければ待機）"""
+        time.sleep(self._reserve(amount))
+
+    async def acquire_async(self, amount=1):
+        """トークンを取得（足りなければ待機、asyncio用）"""
+        await asyncio.sleep(self._reserve(amount))
+
+    def pause(self, seconds):
+        """以降の取得を少なくとも seconds 秒待たせる（API制限エラー時）"""
+        with self._lock:
+            self._refill()
+            self._tokens = min(self._tokens, 0) - seconds * self.fill_rate
+
+
+class GeminiRateLimiter:
+    """Gemini APIのリクエスト数（RPM）とトークン数（TPM）の制限"""
+
+    def __init__(self, rpm, tpm):
+        self.requests = TokenBucket(rpm)
+        self.tokens = TokenBucket(tpm)
+
+    @staticmethod
+    def estimate_tokens(text):
+        """トークン数の見積もり（日本語は1文字≒1トークンとして多めに見積もる）"""
+        return max(1, len(text))
+
+    def acquire(self, tokens):
+        """1リクエスト分の枠を取得（足りなければ待機）"""
+        self.requests.acquire()
+        self.tokens.acquire(tokens)
+
+    async def acquire_async(self, tokens):
+        """1リクエスト分の枠を取得（足りなければ待機、asyncio用）"""
+        await self.requests.acquire_async()
+        await self.tokens.acquire_async(tokens)
+
+    def backoff(self, error):
+        """
+        API制限（429）エラーなら、指定された秒数だけ以降のリクエストを止める
+
+        Returns:
+            float or None: 待機させる秒数（API制限エラーでなければ None）
+        """
+        error_str = str(error)
+        if "429" not in error_str and "quota" not in error_str.lower():
+            return None
+
+        delay_time = 60.0
+        if "retry_delay" in error_str:
+            # retry_delayを抽出
+            delay_match = _RETRY_DELAY_RE.search(error_str)
+            delay_time = float(delay_match.group(1)) + 1 if delay_match else 30.0  # +1秒のバッファ
+
+        self.requests.pause(delay_time)
+        return delay_time
+
+
+@functools.cache
+def get_rate_limiter():
+    """Gemini APIのレート制限（同じプロセス内の全ツールで共有する）"""
+    gemini_config = get_config()['gemini_api']
+    return GeminiRateLimiter(
+        gemini_config.get('rpm', DEFAULT_GEMINI_RPM),
+        gemini_config.get('tpm', DEFAULT_GEMINI_TPM))
+
+
+@functools.cache
+def load_tool(filename):
+    """ツールのスクリプト（例: '1,まとめサイトRSS監視ツール.py'）をモジュールとして読み込む"""
+    path = os.path.join(os.path.dirname(os.path.abspath(__file__)), filename)
+    spec = importlib.util.spec_from_file_location(f"tool_{filename.split(',')[0]}", path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
\ No newline at end of file